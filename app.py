@@ -1,5 +1,7 @@
 import json
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 from exactapi import EXACTAPI
 
@@ -8,6 +10,8 @@ API_PASSWORD = "my-password"
 
 LOGFILE = "exafore.log"
 LOGFORMAT = "%(message)s"
+LOGFILE_MAX_BYTES = 10 * 1024 * 1024
+LOGFILE_BACKUP_COUNT = 5
 
 # Run the ifconfig command on EXL server to get server's IP address.
 HOST = "172.17.128.162"
@@ -22,22 +26,39 @@ def on_notification(message: dict, logger: logging.Logger):
     :param logger: Logger object.
 
     """
-    logger.debug(json.dumps(message))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps(message))
 
 
 def main():
-    logging.basicConfig(filename=LOGFILE, format=LOGFORMAT, level=logging.DEBUG)
+    # The log file is written in a separate thread, so that disk I/O
+    # does not hold up receiving the notifications.
+    file_handler = RotatingFileHandler(
+        LOGFILE,
+        maxBytes=LOGFILE_MAX_BYTES,
+        backupCount=LOGFILE_BACKUP_COUNT
+    )
+    file_handler.setFormatter(logging.Formatter(LOGFORMAT))
+    log_queue = queue.Queue()
+    listener = QueueListener(log_queue, file_handler)
     logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(QueueHandler(log_queue))
+    listener.start()
 
-    client = EXACTAPI(host=HOST, port=PORT)
-    client.connect()
-    client.login(username=API_USERNAME, password=API_PASSWORD)
-    client.channel_join(channel=["measurements", "solution"])
-    client.channel_list()
-    client.recv_notification(callback=on_notification, logger=logger)
-    client.channel_leave(channel=["measurements", "solution"])
-    client.logout()
-    client.disconnect()
+    try:
+        client = EXACTAPI(host=HOST, port=PORT)
+        client.connect()
+        with client.pipeline():
+            client.login(username=API_USERNAME, password=API_PASSWORD)
+            client.channel_join(channel=["measurements", "solution"])
+            client.channel_list()
+        client.recv_notification(callback=on_notification, logger=logger)
+        client.channel_leave(channel=["measurements", "solution"])
+        client.logout()
+        client.disconnect()
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
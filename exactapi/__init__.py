@@ -1 +1,2 @@
 from exactapi.exact import EXACTAPI
+from exactapi.asyncexact import AsyncEXACTAPI
@@ -0,0 +1,186 @@
+from typing import List, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from exactapi.models import (
+    COORDINATES,
+    USER_ROLE,
+    BaseRequest,
+    DeviceID,
+    ElementResponse,
+)
+
+# Models of the administration requests, imported by exactapi.models on
+# first use, so that a client that only logs in and receives
+# notifications does not build their schemas.
+# ---------------------------------------------------------------------
+# Requests: User Accounts
+# ---------------------------------------------------------------------
+class User(BaseModel):
+    login: str
+    password: str
+    roles: Optional[List[USER_ROLE]] = None
+    desc: Optional[str] = None
+
+class UserUpdate(BaseModel):
+    login: str
+    new_login: Optional[str] = None
+    new_password: Optional[str] = None
+    new_roles: Optional[List[USER_ROLE]] = None
+    new_desc: Optional[str] = None
+
+class UserLogin(BaseModel):
+    login: str
+
+class UserAccount(BaseModel):
+    id: int
+    login: str
+    desc: Optional[str] = None
+    roles: Optional[List[USER_ROLE]] = None
+
+class UserAccountResponse(ElementResponse):
+    user: UserAccount
+
+class UserCreateRequest(BaseRequest):
+    request: str = "createUser"
+    user: User
+
+class UserUpdateRequest(BaseRequest):
+    request: str = "updateUser"
+    user: UserUpdate
+
+class UserRemoveRequest(BaseRequest):
+    request: str = "removeUser"
+    user: UserLogin
+
+class UserListRequest(BaseRequest):
+    request: str = "listUsers"
+
+class UserGetRequest(BaseRequest):
+    request: str = "getUser"
+    user: UserLogin
+
+# ---------------------------------------------------------------------
+# Requests: System Configuration
+# ---------------------------------------------------------------------
+class ConfigCoordinatesRequest(BaseRequest):
+    request: str = "setCoordinates"
+    origin: COORDINATES
+    orientation: float
+
+class ConfigAltitudeRequest(BaseRequest):
+    request: str = "setAltitude"
+    altitude: float
+
+class ConfigGetRequest(BaseRequest):
+    request: str = "getConfig"
+    item: str
+
+class ConfigResetAllRequest(BaseRequest):
+    request: str = "resetAllConfig"
+
+# ---------------------------------------------------------------------
+# Requests: Cells
+# ---------------------------------------------------------------------
+class Cell(BaseModel):
+    id: str
+    desc: Optional[str] = None
+    ip_address: str
+    port: Optional[int] = None
+
+class CellOptionalAddr(Cell):
+    ip_address: Optional[str] = None
+
+class CellAddRequest(BaseRequest):
+    request: str = "addCell"
+    cell: Cell
+
+class CellUpdateRequest(BaseRequest):
+    request: str = "updateCell"
+    cell: CellOptionalAddr
+
+class CellRemoveRequest(BaseRequest):
+    request: str = "removeCell"
+    cell: DeviceID
+
+class CellRemoveAllRequest(BaseRequest):
+    request: str = "removeAllCells"
+
+class CellListRequest(BaseRequest):
+    request: str = "listCells"
+
+# ---------------------------------------------------------------------
+# Requests: Base Station
+# ---------------------------------------------------------------------
+class BaseStation(BaseModel):
+    id: str
+    desc: Optional[str] = None
+    position: COORDINATES
+    orientation: Optional[int] = Field(default=0, ge=0, le=359)
+    cell_id: str
+
+class BaseStationOptionalPos(BaseStation):
+    position: Optional[COORDINATES] = None
+
+class BaseStationAddRequest(BaseRequest):
+    request: str = "addBS"
+    bs: BaseStation
+
+class BaseStationUpdateRequest(BaseRequest):
+    request: str = "updateBS"
+    bs: BaseStationOptionalPos
+
+class BaseStationListRequest(BaseRequest):
+    request: str = "listBS"
+
+class BaseStationRemoveRequest(BaseRequest):
+    request: str = "removeBS"
+    bs: DeviceID
+
+class BaseStationRemoveAllRequest(BaseRequest):
+    request: str = "removeAllBS"
+    cell: Optional[DeviceID] = None
+
+# ---------------------------------------------------------------------
+# Requests: Tags
+# ---------------------------------------------------------------------
+class Tag(BaseModel):
+    id: str
+    desc: Optional[str] = None
+    # Mode number or alias. Tried as int first, so a numeric string is
+    # sent as a mode number.
+    mode: Optional[Union[int, str]] = Field(
+        default=None,
+        union_mode="left_to_right"
+    )
+    alt: Optional[float] = None
+
+class TagAddRequest(BaseRequest):
+    request: str = "addTag"
+    tag: Tag
+
+class TagUpdateRequest(BaseRequest):
+    request: str = "updateTag"
+    tag: Tag
+
+class TagListRequest(BaseRequest):
+    request: str = "listTags"
+
+class TagRemoveRequest(BaseRequest):
+    request: str = "removeTag"
+    tag: DeviceID
+
+class TagRemoveAllRequest(BaseRequest):
+    request: str = "removeAllTag"
+
+# ---------------------------------------------------------------------
+# Requests: Tag Communications
+# ---------------------------------------------------------------------
+class Ntfn(BaseModel):
+    id: Optional[str] = None
+    data: str
+
+class NtfnSendRequest(BaseRequest):
+    request: str = "sendNtfn"
+    tag_id: Optional[str] = None
+    ntfn: Ntfn
@@ -0,0 +1,531 @@
+import asyncio
+import inspect
+import socket
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional, Union
+
+from pydantic import ValidationError
+
+from exactapi import models
+from exactapi.exact import (
+    EXACTAPI,
+    RECONNECT_DELAY,
+    RECONNECT_DELAY_MAX,
+    RECV_BUFFER_SIZE,
+    SSL_CONTEXT,
+)
+
+
+class _PendingResponse:
+    """
+    Response to a request sent by AsyncEXACTAPI, passed on message by
+    message from the reader task to the task waiting for it.
+
+    :param message_id: Message ID of the request.
+    :param ismultielem: True in case of multi-element response.
+
+    """
+    __slots__ = ("message_id", "ismultielem", "messages")
+
+    def __init__(self, message_id: int, ismultielem: bool) -> None:
+        self.message_id = message_id
+        self.ismultielem = ismultielem
+        self.messages = asyncio.Queue()
+
+
+class AsyncEXACTAPI(EXACTAPI):
+    """
+    EXACT API client for asyncio.
+
+    Has the same request methods as EXACTAPI, but each of them returns
+    an awaitable, or with stream=True an asynchronous iterator. Because
+    the connection is read and written through asyncio streams, one
+    task can receive notifications while another task sends requests
+    over the same connection.
+
+    :param host: IP address of the EXL server.
+    :param port: Port number of the EXL server.
+    :param debug: If true, print messages to terminal.
+    :param tcp_nodelay: If true, disable Nagle's algorithm on the socket.
+    :param recv_timeout: Timeout in seconds for receiving notifications.
+        When no notification arrives in time, recv_notification() pings
+        the server and reconnects if it does not respond. None disables.
+
+    """
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            debug: bool = True,
+            tcp_nodelay: bool = True,
+            recv_timeout: Optional[float] = 30.0
+        ) -> None:
+        super().__init__(
+            host,
+            port,
+            debug=debug,
+            tcp_nodelay=tcp_nodelay,
+            recv_timeout=recv_timeout
+        )
+        self.reader = None
+        # Only the reader task reads the connection. It passes the
+        # responses to the requests waiting for them by message ID, and
+        # holds the notifications back for recv_notification(). The
+        # pending responses are kept in request order.
+        self._reader_task = None
+        self._reader_error = None
+        self._pending = {}
+        self._notification_ready = None
+
+
+    async def _handle_exception(self, exception: ValidationError) -> dict:
+        """
+        Handle the validation error of the pydantic model.
+
+        :param exception: Validation error.
+
+        """
+        return super()._handle_exception(exception)
+
+
+    def _write(
+            self,
+            request: models.BaseRequest,
+            ismultielem: bool = False
+        ) -> Optional[_PendingResponse]:
+        """
+        Write a request message to the connection without waiting for
+        the write buffer to drain.
+
+        :param request: Request model.
+        :param ismultielem: True in case of multi-element response.
+        :returns: Pending response, or None if not connected.
+        :raises: ConnectionError if the connection has been lost.
+
+        """
+        if self.connection is None:
+            return None
+        if self._reader_error is not None:
+            raise ConnectionError("Connection to the EXL server lost")
+        message = self._encode(request)
+        pending = _PendingResponse(self.message_id, ismultielem)
+        self._pending[pending.message_id] = pending
+        if self._send_buffer is not None:
+            self._send_buffer += message
+        else:
+            self.connection.write(message)
+        return pending
+
+
+    async def _send(
+            self,
+            request: models.BaseRequest,
+            ismultielem: bool = False
+        ) -> Optional[_PendingResponse]:
+        """
+        Send a request message to the EXL server.
+
+        :param request: Request model.
+        :param ismultielem: True in case of multi-element response.
+        :returns: Pending response, or None if not connected.
+        :raises: ConnectionError if the connection has been lost.
+
+        """
+        pending = self._write(request, ismultielem)
+        if pending is not None and self._send_buffer is None:
+            await self.connection.drain()
+        return pending
+
+
+    def _flush(self):
+        """Send the request messages buffered by _batched() at once."""
+        if self._send_buffer:
+            self.connection.write(self._send_buffer)
+            self._send_buffer.clear()
+
+
+    @asynccontextmanager
+    async def pipeline(self):
+        """
+        Send the requests made inside the async with-block in a single
+        write without waiting for their responses, and then receive all
+        the responses. See EXACTAPI.pipeline().
+
+        """
+        if self._pipeline is not None:
+            raise RuntimeError("Pipelines cannot be nested")
+        responses = []
+        self._pipeline = []
+        try:
+            with self._batched():
+                yield responses
+        except BaseException:
+            # The buffered requests were not sent, so no responses to
+            # them will arrive.
+            for pending, _, _ in self._pipeline:
+                if pending is not None:
+                    self._pending.pop(pending.message_id, None)
+            raise
+        finally:
+            pipeline = self._pipeline
+            self._pipeline = None
+        for pending, ismultielem, on_response in pipeline:
+            response = await self._recv(pending, ismultielem)
+            if on_response is not None:
+                on_response(response)
+            responses.append(response)
+
+
+    async def _readline(self) -> bytes:
+        """
+        Read one newline-terminated message from the EXL server.
+
+        :returns: Message as bytes.
+        :raises: ConnectionError if the server closed the connection.
+
+        """
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by the EXL server")
+        return line
+
+
+    async def _readlines(self) -> List[bytes]:
+        """
+        Read all the messages that have already been received from the
+        EXL server. Waits only if there are none.
+
+        :returns: List of messages as bytes.
+        :raises: ConnectionError if the server closed the connection.
+
+        """
+        chunk = await self.reader.read(RECV_BUFFER_SIZE)
+        if not chunk:
+            raise ConnectionError("Connection closed by the EXL server")
+        if not chunk.endswith(b"\n"):
+            chunk += await self._readline()
+        return chunk.split(b"\n")[:-1]
+
+
+    async def _read_messages(self):
+        """
+        Read the messages from the EXL server until the connection is
+        closed, and pass each of them on to the task waiting for it.
+
+        """
+        try:
+            while True:
+                for message in await self._readlines():
+                    response = self._decode_response(message)
+                    if response is None:
+                        self._notification_ready.set()
+                        continue
+                    message_id = response.get("msgid")
+                    pending = self._pending.get(message_id)
+                    # A response without a message ID goes to the oldest
+                    # request, as the server responds in request order.
+                    if pending is None and not message_id and self._pending:
+                        pending = next(iter(self._pending.values()))
+                    if pending is None:
+                        continue
+                    pending.messages.put_nowait(response)
+                    # Retired on its last message, so that the next
+                    # response goes to the next request.
+                    if self._is_last(response, pending.ismultielem):
+                        del self._pending[pending.message_id]
+        except Exception as exc:
+            self._reader_error = exc
+            self._fail_pending(exc)
+            self._notification_ready.set()
+
+
+    def _fail_pending(self, exception: Exception):
+        """
+        Pass an exception on to the requests still waiting for their
+        responses, and forget them.
+
+        :param exception: Exception raised by the waiting tasks.
+
+        """
+        for pending in self._pending.values():
+            pending.messages.put_nowait(exception)
+        self._pending.clear()
+
+
+    async def _recv_elements(
+            self,
+            pending: Optional[_PendingResponse]
+        ) -> AsyncIterator[dict]:
+        """
+        Receive a response from the EXL server message by message.
+
+        :param pending: Pending response to a request.
+        :returns: Asynchronous iterator over the messages of the response.
+
+        """
+        if pending is None:
+            return
+        if self._send_buffer is not None:
+            self._flush()
+        while True:
+            response = await pending.messages.get()
+            if isinstance(response, Exception):
+                raise response
+            yield response
+            if self._is_last(response, pending.ismultielem):
+                return
+
+
+    async def _recv(
+            self,
+            pending: Optional[_PendingResponse],
+            ismultielem: bool = False
+        ) -> Union[dict, List[dict]]:
+        """
+        Receive a response from the EXL server.
+
+        :param pending: Pending response to a request.
+        :param ismultielem: True in case of multi-element response.
+        :returns: Single-element or multi-element response.
+
+        """
+        elements = [element async for element in self._recv_elements(pending)]
+        if ismultielem is True:
+            return elements
+        return elements[-1] if elements else {}
+
+
+    async def _request(
+            self,
+            request: models.BaseRequest,
+            ismultielem: bool = False,
+            on_response: Optional[Callable] = None
+        ) -> Union[dict, List[dict]]:
+        """
+        Send a request message and receive the response to it.
+
+        :param request: Request model.
+        :param ismultielem: True in case of multi-element response.
+        :param on_response: Function to call with the response, also
+            when the response is received by pipeline().
+        :returns: Single-element or multi-element response, or None
+            inside pipeline().
+
+        """
+        pending = await self._send(request, ismultielem)
+        if self._pipeline is not None:
+            self._pipeline.append((pending, ismultielem, on_response))
+            return None
+        response = await self._recv(pending, ismultielem)
+        if on_response is not None:
+            on_response(response)
+        return response
+
+
+    def _request_stream(
+            self,
+            request: models.BaseRequest
+        ) -> AsyncIterator[dict]:
+        """
+        Send a request message and return an asynchronous iterator over
+        the elements of the multi-element response to it.
+
+        :param request: Request model.
+        :returns: Asynchronous iterator over the elements of the response.
+        :raises: RuntimeError inside pipeline().
+
+        """
+        if self._pipeline is not None:
+            raise RuntimeError("Streamed responses cannot be pipelined")
+        # Written now, as in EXACTAPI, so that the requests are sent in
+        # the order they are made, not in the order they are iterated.
+        return self._stream(self._write(request, ismultielem=True))
+
+
+    async def _stream(
+            self,
+            pending: Optional[_PendingResponse]
+        ) -> AsyncIterator[dict]:
+        """
+        Yield the elements of the multi-element response to a request
+        written by _request_stream().
+
+        :param pending: Pending response to the request.
+
+        """
+        if pending is not None:
+            await self.connection.drain()
+        async for element in self._recv_elements(pending):
+            yield element
+
+
+    async def recv_notification(
+            self,
+            callback: Callable = None,
+            batch: bool = False,
+            validate: bool = False,
+            decoder: Callable = None,
+            **kwargs
+        ):
+        """
+        Receive notification message(s) from the EXL server until the
+        task is cancelled.
+
+        The notifications are passed on in batches of all the messages
+        that have already been received. Requests can be made from other
+        tasks meanwhile.
+
+        :param callable: Function or coroutine function to call when a
+            notification is received.
+        :param batch: If true, the callback is called once per batch
+            with a list of notifications instead of once per notification.
+        :param validate: If true, the notifications are validated into
+            notification models instead of passed on as dictionaries.
+        :param decoder: Function that decodes a notification message
+            from bytes, e.g. exactapi.models_fast.decode_notification.
+            Overrides validate.
+        :param kwargs: Keyword arguments for the callback function.
+
+        """
+        if self.connection is None:
+            return
+        if self._send_buffer is not None:
+            self._flush()
+        backlog = self._notification_backlog
+        decode = self._decode_notification if validate else self._decode
+        if decoder:
+            decode = decoder
+        while True:
+            if not backlog:
+                if self._reader_error is not None:
+                    # E.g. the server has been restarted.
+                    await self._reconnect()
+                    continue
+                ready = self._notification_ready
+                ready.clear()
+                try:
+                    await asyncio.wait_for(ready.wait(), self.recv_timeout)
+                except asyncio.TimeoutError:
+                    await self._check_connection()
+                continue
+            messages = list(backlog)
+            backlog.clear()
+            notifications = [decode(message) for message in messages]
+            if not callback:
+                continue
+            if batch:
+                notifications = [notifications]
+            for notification in notifications:
+                result = callback(notification, **kwargs)
+                if inspect.isawaitable(result):
+                    await result
+
+
+    # -----------------------------------------------------------------
+    # Connection
+    # -----------------------------------------------------------------
+    async def connect(self):
+        """
+        Connect to the EXL server.
+
+        :raises: ConnectionError if no connection to the server.
+
+        """
+        # The socket is configured before connecting, as in EXACTAPI, so
+        # that the buffer sizes apply to the TCP handshake.
+        tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._configure_socket(tcp_socket)
+        tcp_socket.setblocking(False)
+        try:
+            await asyncio.get_running_loop().sock_connect(
+                tcp_socket, (self.host, self.port)
+            )
+            reader, writer = await asyncio.open_connection(
+                sock=tcp_socket,
+                ssl=SSL_CONTEXT,
+                server_hostname=self.host,
+                limit=RECV_BUFFER_SIZE,
+            )
+        except OSError as exc:
+            tcp_socket.close()
+            raise ConnectionError(f"Error number: {exc.errno}") from exc
+        self.reader = reader
+        self.connection = writer
+        self._reader_error = None
+        self._notification_ready = asyncio.Event()
+        self._reader_task = asyncio.create_task(self._read_messages())
+
+
+    async def _stop_reader(self):
+        """Stop the reader task and fail the requests still waiting."""
+        if self._reader_task is None:
+            return
+        self._reader_task.cancel()
+        try:
+            await self._reader_task
+        except asyncio.CancelledError:
+            pass
+        self._reader_task = None
+        self._fail_pending(ConnectionError("Disconnected"))
+
+
+    async def disconnect(self):
+        """Disconnect from the EXL server."""
+        if self.connection is None:
+            return
+        await self._stop_reader()
+        self.connection.close()
+        await self.connection.wait_closed()
+
+
+    async def _check_connection(self):
+        """
+        Ping the EXL server after a receive timeout, and reconnect if
+        the server does not respond.
+
+        """
+        try:
+            response = await asyncio.wait_for(self.ping(), self.recv_timeout)
+        except (OSError, ValueError, asyncio.TimeoutError):
+            response = {}
+        if response.get("response") != "ack":
+            await self._reconnect()
+
+
+    async def _reconnect(self):
+        """
+        Reconnect to the EXL server, log in again and rejoin the
+        channels joined earlier. Retried with an increasing delay until
+        it succeeds.
+
+        """
+        delay = RECONNECT_DELAY
+        while True:
+            try:
+                await self._restore_session()
+                return
+            except OSError as exc:
+                if self.debug:
+                    print(f"Reconnecting failed: {exc}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+
+
+    async def _restore_session(self):
+        """
+        Connect to the EXL server again, log in again and rejoin the
+        channels joined earlier.
+
+        """
+        await self._stop_reader()
+        # Waiting for the TLS shutdown could block on a dead connection.
+        self.connection.close()
+        await self.connect()
+        if self._credentials is None:
+            return
+        username, password = self._credentials
+        channels = sorted(self._channels)
+        async with self.pipeline():
+            await self.login(username=username, password=password)
+            if channels:
+                await self.channel_join(channel=channels)
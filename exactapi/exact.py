@@ -1,13 +1,74 @@
 import json
 import ssl
 import socket
-from typing import Callable, List, Union
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Iterator, List, Optional, Union
 
 from pydantic import ValidationError
 
 from exactapi import models
 
-MAX_MESSAGE_LENGTH = 4096
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Maximum number of bytes received from the socket at once.
+RECV_BUFFER_SIZE = 65536
+
+# Maximum number of notifications held back while waiting for a
+# response, for recv_notification() to pass on later. Beyond it, the
+# oldest are dropped.
+NOTIFICATION_BACKLOG = 4096
+
+# Requested size of the kernel send and receive buffers of the socket.
+# The OS caps these, e.g. on Linux to net.core.wmem_max/rmem_max.
+SOCKET_BUFFER_SIZE = 1 << 20
+
+# TCP keepalive: idle seconds before the first probe, seconds between
+# the probes, and the number of failed probes before the connection is
+# dropped. Applied where the platform supports the options.
+KEEPALIVE_IDLE = 30
+KEEPALIVE_INTERVAL = 10
+KEEPALIVE_COUNT = 3
+
+# Seconds to wait before retrying a failed reconnect. The delay is
+# doubled after each failure, up to the maximum.
+RECONNECT_DELAY = 1.0
+RECONNECT_DELAY_MAX = 60.0
+
+# Response types that end a response: acknowledge, end of multi-element
+# response and error.
+_TERMINAL_RESPONSES = frozenset(("ack", "end", "error"))
+_ELEMENT_RESPONSE = "element"
+
+
+def _create_ssl_context() -> ssl.SSLContext:
+    """Create the SSL context for the connection to the EXL server."""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+# The context is shared by all connections, which also lets a client
+# resume its previous TLS session when it reconnects.
+SSL_CONTEXT = _create_ssl_context()
+
+
+# _json_dumps returns the newline-terminated message, so the newline
+# does not have to be concatenated to the serialized request. Without
+# orjson, requests are serialized with models.encode() instead.
+if orjson is not None:
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+else:
+    _json_loads = json.loads
 
 
 class EXACTAPI:
@@ -17,15 +78,45 @@ class EXACTAPI:
     :param host: IP address of the EXL server.
     :param port: Port number of the EXL server.
     :param debug: If true, print messages to terminal.
+    :param tcp_nodelay: If true, disable Nagle's algorithm on the socket.
+    :param recv_timeout: Timeout in seconds for connecting and for
+        receiving notifications. When no notification arrives in time,
+        recv_notification() pings the server and reconnects if it does
+        not respond. None disables.
 
     """
-    def __init__(self, host: str, port: int, debug: bool = True) -> None:
+    # Requests without parameters are built once and shared. The
+    # administration requests are not, so that importing the client
+    # does not import their models.
+    _LOGOUT_REQUEST = models.AuthLogoutRequest()
+    _PING_REQUEST = models.AuthPingRequest()
+    _CHANNEL_LIST_REQUEST = models.ChannelListRequest()
+
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            debug: bool = True,
+            tcp_nodelay: bool = True,
+            recv_timeout: Optional[float] = 30.0
+        ) -> None:
         self.host = host
         self.port = port
         self.debug = debug
+        self.tcp_nodelay = tcp_nodelay
+        self.recv_timeout = recv_timeout
         
         self.connection = None
+        self._recv_buffer = bytearray()
+        self._notification_backlog = deque(maxlen=NOTIFICATION_BACKLOG)
+        self._sendall = None
+        self.tls_session = None
         self.message_id = 0
+        self._send_buffer = None
+        self._pipeline = None
+        # Session state restored after a reconnect.
+        self._credentials = None
+        self._channels = set()
 
 
     def _handle_exception(self, exception: ValidationError) -> dict:
@@ -34,6 +125,16 @@ class EXACTAPI:
 
         :param exception: Validation error.
 
+        """
+        return self._exception_response(exception)
+
+
+    def _exception_response(self, exception: ValidationError) -> dict:
+        """
+        Build the response returned in place of a validation error.
+
+        :param exception: Validation error.
+
         """
         error = {
             "response": "exception",
@@ -44,6 +145,96 @@ class EXACTAPI:
         return error
 
 
+    def _encode(self, request: models.BaseRequest) -> bytes:
+        """
+        Assign the next message ID to a request and serialize it.
+
+        :param request: Request model.
+        :returns: Newline-terminated request message.
+
+        """
+        message_id = self.message_id + 1
+        self.message_id = message_id
+        if orjson is None:
+            # Serializing in pydantic-core is faster than the json module.
+            # The copy keeps the shared requests unmodified.
+            request = request.model_copy(update={"msgid": message_id})
+            message = models.encode(request)
+        else:
+            # The message ID is set on the payload only, so that the
+            # shared requests without parameters are never modified.
+            payload = request.model_dump(exclude_none=True, mode="json")
+            payload["msgid"] = message_id
+            message = _json_dumps(payload)
+        if self.debug:
+            # The encoded message is printed, so that the request is not
+            # serialized twice.
+            print(message.decode(), end="")
+        return message
+
+
+    def _decode(self, message: bytes) -> dict:
+        """
+        Parse a response or notification message.
+
+        :param message: Newline-terminated message.
+        :returns: Message as a dictionary.
+
+        """
+        response = _json_loads(message)
+        if self.debug:
+            print(response)
+        return response
+
+
+    def _decode_response(self, message: bytes) -> Optional[dict]:
+        """
+        Parse a message received while waiting for a response.
+        Notifications are held back for recv_notification().
+
+        :param message: Newline-terminated message.
+        :returns: Response as a dictionary, or None for a notification.
+
+        """
+        response = self._decode(message)
+        if "response" not in response:
+            self._notification_backlog.append(message)
+            return None
+        return response
+
+
+    def _decode_notification(
+            self,
+            message: bytes
+        ) -> Union[models.Notification, dict]:
+        """
+        Parse and validate a notification message. The high-rate
+        notifications are not validated if EXACTAPI_TRUST_SERVER is set.
+
+        :param message: Newline-terminated message.
+        :returns: Notification model, the notification as a dictionary
+            if its channel has no model, or an exception response if
+            the message does not match its notification model.
+
+        """
+        # Parsed once, and validated only if the channel has a model.
+        notification = data = _json_loads(message)
+        if data.get("channel") in models.NOTIFICATION_CHANNELS:
+            notification = None
+            if models.EXACTAPI_TRUST_SERVER:
+                notification = models.construct_notification(data)
+            if notification is None:
+                try:
+                    notification = models.NOTIFICATION_ADAPTER.validate_python(
+                        data
+                    )
+                except ValidationError as exc:
+                    return self._exception_response(exc)
+        if self.debug:
+            print(repr(notification))
+        return notification
+
+
     def _send(self, request: models.BaseRequest):
         """
         Send a request message to the EXL server.
@@ -53,13 +244,159 @@ class EXACTAPI:
         """
         if self.connection is None:
             return
-        self.message_id += 1
-        request.msgid = self.message_id
-        if self.debug:
-            print(request.model_dump(exclude_none=True))
-        message = f"{request.model_dump_json(exclude_none=True)}\n"
-        self.connection.sendall(message.encode())
-        
+        message = self._encode(request)
+        if self._send_buffer is not None:
+            self._send_buffer += message
+            return
+        self._sendall(message)
+
+
+    def _flush(self):
+        """Send the request messages buffered by _batched() at once."""
+        if self._send_buffer:
+            self._sendall(self._send_buffer)
+            self._send_buffer.clear()
+
+
+    @contextmanager
+    def _batched(self):
+        """
+        Buffer the request messages sent inside the with-block and send
+        them to the EXL server in a single write. Used by pipeline(),
+        whose requests do not wait for their responses.
+
+        """
+        self._send_buffer = bytearray()
+        try:
+            yield
+            if self.connection is not None:
+                self._flush()
+        finally:
+            self._send_buffer = None
+
+
+    @contextmanager
+    def pipeline(self):
+        """
+        Send the requests made inside the with-block in a single write
+        without waiting for their responses, and then receive all the
+        responses. The whole sequence takes one round-trip instead of
+        one per request.
+
+        Inside the with-block the request methods return None. The
+        responses are appended, in request order, to the list returned
+        by the context manager when the with-block exits. A request
+        that fails validation is not sent and has no response there.
+
+        """
+        if self._pipeline is not None:
+            raise RuntimeError("Pipelines cannot be nested")
+        responses = []
+        self._pipeline = []
+        try:
+            with self._batched():
+                yield responses
+        finally:
+            pending = self._pipeline
+            self._pipeline = None
+        for ismultielem, on_response in pending:
+            response = self._recv(ismultielem=ismultielem)
+            if on_response is not None:
+                on_response(response)
+            responses.append(response)
+
+
+    def _fill(self):
+        """
+        Receive the next chunk of data from the EXL server into the
+        receive buffer. Data already in the buffer is kept if the
+        socket times out.
+
+        :raises: ConnectionError if the server closed the connection.
+
+        """
+        chunk = self.connection.recv(RECV_BUFFER_SIZE)
+        if not chunk:
+            raise ConnectionError("Connection closed by the EXL server")
+        self._recv_buffer += chunk
+
+
+    def _readline(self) -> bytes:
+        """
+        Read one newline-terminated message from the EXL server.
+
+        :returns: Message as bytes.
+        :raises: ConnectionError if the server closed the connection.
+
+        """
+        buffer = self._recv_buffer
+        end = buffer.find(b"\n")
+        while end < 0:
+            start = len(buffer)
+            self._fill()
+            end = buffer.find(b"\n", start)
+        line = bytes(buffer[:end + 1])
+        del buffer[:end + 1]
+        return line
+
+
+    def _readlines(self) -> List[bytes]:
+        """
+        Read all the messages that have already been received from the
+        EXL server. Waits only if there are none.
+
+        :returns: List of messages as bytes.
+        :raises: ConnectionError if the server closed the connection.
+
+        """
+        buffer = self._recv_buffer
+        end = buffer.rfind(b"\n")
+        while end < 0:
+            self._fill()
+            end = buffer.rfind(b"\n")
+        lines = bytes(buffer[:end]).split(b"\n")
+        del buffer[:end + 1]
+        return lines
+
+
+    @staticmethod
+    def _is_last(response: dict, ismultielem: bool) -> bool:
+        """
+        Tell whether a message is the last one of a response.
+
+        :param response: Response message as a dictionary.
+        :param ismultielem: True in case of multi-element response.
+
+        """
+        response_type = response.get("response", "")
+        # Acknowledge response, end of multi-element response, or
+        # error response.
+        if response_type in _TERMINAL_RESPONSES:
+            return True
+        # Single-element response of type 'element'.
+        return not ismultielem and response_type == _ELEMENT_RESPONSE
+
+
+    def _recv_elements(self, ismultielem: bool = True) -> Iterator[dict]:
+        """
+        Receive a response from the EXL server message by message.
+
+        :param ismultielem: True in case of multi-element response.
+        :returns: Iterator over the messages of the response.
+
+        """
+        if self.connection is None:
+            return
+        if self._send_buffer is not None:
+            self._flush()
+        while True:
+            response = self._decode_response(self._readline())
+            if response is None:
+                continue
+            yield response
+            if self._is_last(response, ismultielem):
+                return
+
 
     def _recv(self, ismultielem: bool = False) -> Union[dict, List[dict]]:
         """
@@ -69,57 +406,158 @@ class EXACTAPI:
         :returns: Single-element or multi-element response.
 
         """
-        response = {}  # single-element response
-        elements = []  # multi-element response
-        if self.connection is None:
-            if ismultielem is True:
-                return elements
-            return response
-        while True:
-            message = self.connection.recv(MAX_MESSAGE_LENGTH).decode()
-            response = dict(json.loads(message))
-            response_type = response.get("response", "")
-            if self.debug:
-                print(response)
-            if ismultielem:
-                elements.append(response)
-            # Acknowledge response, end of multi-element response, or
-            # error response.
-            if response_type in ("ack", "end", "error"):
-                break
-            # Single-elemet response of type 'element'.
-            if response_type == "element" and ismultielem is False:
-                break
+        elements = list(self._recv_elements(ismultielem))
         if ismultielem is True:
             return elements
+        return elements[-1] if elements else {}
+
+
+    def _request(
+            self,
+            request: models.BaseRequest,
+            ismultielem: bool = False,
+            on_response: Optional[Callable] = None
+        ) -> Union[dict, List[dict]]:
+        """
+        Send a request message and receive the response to it.
+
+        :param request: Request model.
+        :param ismultielem: True in case of multi-element response.
+        :param on_response: Function to call with the response, also
+            when the response is received by pipeline().
+        :returns: Single-element or multi-element response, or None
+            inside pipeline().
+
+        """
+        self._send(request)
+        if self._pipeline is not None:
+            self._pipeline.append((ismultielem, on_response))
+            return None
+        response = self._recv(ismultielem=ismultielem)
+        if on_response is not None:
+            on_response(response)
         return response
 
 
-    def recv_notification(self, callback: Callable = None, **kwargs):
+    def _request_stream(self, request: models.BaseRequest) -> Iterator[dict]:
+        """
+        Send a request message and return an iterator over the elements
+        of the multi-element response to it.
+
+        :param request: Request model.
+        :returns: Iterator over the elements of the response.
+        :raises: RuntimeError inside pipeline().
+
+        """
+        if self._pipeline is not None:
+            raise RuntimeError("Streamed responses cannot be pipelined")
+        self._send(request)
+        return self._recv_elements()
+
+
+    def recv_notification(
+            self,
+            callback: Callable = None,
+            batch: bool = False,
+            validate: bool = False,
+            decoder: Callable = None,
+            **kwargs
+        ):
         """
         Receive notification message(s) from the EXL server.
 
+        The notifications are read in batches of all the messages that
+        have already been received. Notifications received earlier while
+        waiting for a response are passed on first.
+
         :param callable: Function to call when a notification is received.
+        :param batch: If true, the callback is called once per batch
+            with a list of notifications instead of once per notification.
+        :param validate: If true, the notifications are validated into
+            notification models instead of passed on as dictionaries.
+        :param decoder: Function that decodes a notification message
+            from bytes, e.g. exactapi.models_fast.decode_notification.
+            Overrides validate.
         :param kwargs: Keyword arguments for the callback function.
 
         """
         if self.connection is None:
             return
-        while True:
-            try:
-                message = self.connection.recv(MAX_MESSAGE_LENGTH).decode()
-                notification = dict(json.loads(message))
-                if self.debug:
-                    print(notification)
-                if callback:
-                    callback(notification, **kwargs)
-            except KeyboardInterrupt:
-                break
+        if self._send_buffer is not None:
+            self._flush()
+        readlines = self._readlines
+        backlog = self._notification_backlog
+        decode = self._decode_notification if validate else self._decode
+        if decoder:
+            decode = decoder
+        # Only the notifications are received with a timeout, so that
+        # a slow response to a request does not break the connection.
+        self.connection.settimeout(self.recv_timeout)
+        try:
+            while True:
+                try:
+                    if backlog:
+                        messages = list(backlog)
+                        backlog.clear()
+                    else:
+                        messages = readlines()
+                    notifications = [decode(message) for message in messages]
+                    if not callback:
+                        continue
+                    if batch:
+                        callback(notifications, **kwargs)
+                        continue
+                    for notification in notifications:
+                        callback(notification, **kwargs)
+                except TimeoutError:
+                    self._check_connection()
+                    self.connection.settimeout(self.recv_timeout)
+                except OSError:
+                    # E.g. ConnectionError when the server is restarted.
+                    self._reconnect()
+                    self.connection.settimeout(self.recv_timeout)
+                except KeyboardInterrupt:
+                    break
+        finally:
+            # The socket is closed if reconnecting failed.
+            if self.connection.fileno() != -1:
+                self.connection.settimeout(None)
 
 
     # -----------------------------------------------------------------
     # Connection
     # -----------------------------------------------------------------
+    def _configure_socket(self, tcp_socket: socket.socket):
+        """
+        Set the options of the TCP socket of the connection.
+
+        :param tcp_socket: TCP socket.
+
+        """
+        # Requests and responses are small JSON messages, so do not let
+        # Nagle's algorithm delay them. Keepalive detects dead sessions.
+        if self.tcp_nodelay:
+            tcp_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            tcp_socket.setsockopt(
+                socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE
+            )
+            tcp_socket.setsockopt(
+                socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, KEEPALIVE_INTERVAL
+            )
+            tcp_socket.setsockopt(
+                socket.IPPROTO_TCP, socket.TCP_KEEPCNT, KEEPALIVE_COUNT
+            )
+        # Larger kernel buffers keep up with busy notification channels.
+        tcp_socket.setsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE
+        )
+        tcp_socket.setsockopt(
+            socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE
+        )
+
+
     def connect(self):
         """
         Connect to the EXL server.
@@ -127,15 +565,19 @@ class EXACTAPI:
         :raises: ConnectionError if no connection to the server.
 
         """
-        context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
-        context.verify_mode = ssl.CERT_NONE
-        context.load_default_certs()
-
         tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        ssl_socket = context.wrap_socket(tcp_socket)
+        self._configure_socket(tcp_socket)
+        tcp_socket.settimeout(self.recv_timeout)
+        ssl_socket = SSL_CONTEXT.wrap_socket(
+            tcp_socket,
+            session=self.tls_session
+        )
         err_number = ssl_socket.connect_ex((self.host, self.port))
         if err_number == 0:
+            ssl_socket.settimeout(None)
             self.connection = ssl_socket
+            self._sendall = ssl_socket.sendall
+            self._recv_buffer.clear()
         else:
             raise ConnectionError(f"Error number: {err_number}")
 
@@ -144,7 +586,62 @@ class EXACTAPI:
         """Disconnect from the EXL server."""
         if self.connection is None:
             return
+        self.tls_session = self.connection.session
         self.connection.close()
+
+
+    def _check_connection(self):
+        """
+        Ping the EXL server after a receive timeout, and reconnect if
+        the server does not respond.
+
+        """
+        try:
+            response = self.ping()
+        except (OSError, ValueError):
+            response = {}
+        if response.get("response") != "ack":
+            self._reconnect()
+
+
+    def _reconnect(self):
+        """
+        Reconnect to the EXL server, log in again and rejoin the
+        channels joined earlier. Retried with an increasing delay until
+        it succeeds.
+
+        """
+        delay = RECONNECT_DELAY
+        while True:
+            try:
+                self._restore_session()
+                return
+            except OSError as exc:
+                if self.debug:
+                    print(f"Reconnecting failed: {exc}")
+                time.sleep(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+
+
+    def _restore_session(self):
+        """
+        Connect to the EXL server again, log in again and rejoin the
+        channels joined earlier.
+
+        """
+        try:
+            self.disconnect()
+        except OSError:
+            pass
+        self.connect()
+        if self._credentials is None:
+            return
+        username, password = self._credentials
+        channels = sorted(self._channels)
+        with self.pipeline():
+            self.login(username=username, password=password)
+            if channels:
+                self.channel_join(channel=channels)
     
     # -----------------------------------------------------------------
     # Authentication and Session Control
@@ -163,8 +660,8 @@ class EXACTAPI:
                 user=username,
                 password=password
             )
-            self._send(request)
-            return self._recv()
+            self._credentials = (username, password)
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -178,9 +675,9 @@ class EXACTAPI:
         :returns: On success, the server responds with RPL_ACK message.
 
         """
-        request = models.AuthLogoutRequest()
-        self._send(request)
-        return self._recv()
+        self._credentials = None
+        self._channels.clear()
+        return self._request(self._LOGOUT_REQUEST)
 
 
     def ping(self) -> dict:
@@ -190,9 +687,7 @@ class EXACTAPI:
         :returns: On success, the server responds with RPL_ACK message.
 
         """
-        request = models.AuthPingRequest()
-        self._send(request)
-        return self._recv()
+        return self._request(self._PING_REQUEST)
 
 
     # -----------------------------------------------------------------
@@ -224,8 +719,7 @@ class EXACTAPI:
                     desc=desc
                 )
             )
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
     
@@ -261,8 +755,7 @@ class EXACTAPI:
                     new_desc=new_desc
                 )
             )
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -281,22 +774,26 @@ class EXACTAPI:
                     login=username,
                 )
             )
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
 
-    def user_list(self) -> List[dict]:
+    def user_list(
+            self,
+            stream: bool = False
+        ) -> Union[List[dict], Iterator[dict]]:
         """
         List all user accounts in the system. Authorization: USER.
 
+        :param stream: If true, return an iterator that yields the response
+            elements as they are received. Consume it before the next request.
         :returns: On success, the server responds with a multi-element response.
 
         """
-        request = models.UserListRequest()
-        self._send(request)
-        return self._recv(ismultielem=True)
+        if stream:
+            return self._request_stream(models.UserListRequest())
+        return self._request(models.UserListRequest(), ismultielem=True)
 
 
     def user_get(self, username: str) -> dict:
@@ -310,8 +807,7 @@ class EXACTAPI:
             request = models.UserGetRequest(
                 user=models.UserLogin(login=username)
             )
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -345,8 +841,7 @@ class EXACTAPI:
                 origin=[lat, lon, alt],
                 orientation=angle
             )
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -361,8 +856,7 @@ class EXACTAPI:
         """
         try:
             request = models.ConfigAltitudeRequest(altitude=altitude)
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -377,8 +871,7 @@ class EXACTAPI:
         """
         try:
             request = models.ConfigGetRequest(item=item)
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -390,9 +883,7 @@ class EXACTAPI:
         :returns: On success, the server responds with RPL_ACK.
 
         """
-        request = models.ConfigResetAllRequest()
-        self._send(request)
-        return self._recv()
+        return self._request(models.ConfigResetAllRequest())
 
     # -----------------------------------------------------------------
     # Cells
@@ -423,8 +914,7 @@ class EXACTAPI:
                 desc = desc,
             )
         )
-        self._send(request)
-        return self._recv()
+        return self._request(request)
 
 
     def cell_update(
@@ -452,8 +942,7 @@ class EXACTAPI:
                 desc = desc
             )
         )
-        self._send(request)
-        return self._recv()
+        return self._request(request)
 
 
     def cell_remove(self, cell_id: str) -> dict:
@@ -468,8 +957,7 @@ class EXACTAPI:
             request = models.CellRemoveRequest(
                 cell=models.DeviceID(id=cell_id)
             )
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -482,21 +970,24 @@ class EXACTAPI:
         :returns: On success, the server responds with RPL_ACK.
 
         """
-        request = models.CellRemoveAllRequest()
-        self._send(request)
-        return self._recv()
+        return self._request(models.CellRemoveAllRequest())
 
 
-    def cell_list(self) -> List[dict]:
+    def cell_list(
+            self,
+            stream: bool = False
+        ) -> Union[List[dict], Iterator[dict]]:
         """
         List all cells in the system. Authorization: USER.
 
+        :param stream: If true, return an iterator that yields the response
+            elements as they are received. Consume it before the next request.
         :returns: On success, the server responds with multi-element response.
 
         """
-        request = models.CellListRequest()
-        self._send(request)
-        return self._recv(ismultielem=True)
+        if stream:
+            return self._request_stream(models.CellListRequest())
+        return self._request(models.CellListRequest(), ismultielem=True)
 
     # -----------------------------------------------------------------
     # Base Stations
@@ -532,8 +1023,7 @@ class EXACTAPI:
                     desc=desc,
                 )
             )
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -568,22 +1058,26 @@ class EXACTAPI:
                     orientation=angle,
                 )
             )
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
 
-    def bs_list(self) -> List[dict]:
+    def bs_list(
+            self,
+            stream: bool = False
+        ) -> Union[List[dict], Iterator[dict]]:
         """
         List all base stations in the system. Authorization: USER.
 
+        :param stream: If true, return an iterator that yields the response
+            elements as they are received. Consume it before the next request.
         :returns: On success, the server responds with multi-element response.
 
         """
-        request = models.BaseStationListRequest()
-        self._send(request)
-        return self._recv(ismultielem=True)
+        if stream:
+            return self._request_stream(models.BaseStationListRequest())
+        return self._request(models.BaseStationListRequest(), ismultielem=True)
 
 
     def bs_remove(self, bs_id: str) -> dict:
@@ -598,8 +1092,7 @@ class EXACTAPI:
             request = models.BaseStationRemoveRequest(
                 bs=models.DeviceID(id=bs_id)
             )
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -622,8 +1115,7 @@ class EXACTAPI:
                 )
             else:
                 request = models.BaseStationRemoveAllRequest()
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -659,8 +1151,7 @@ class EXACTAPI:
                     alt = alt
                 )
             )
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -692,22 +1183,26 @@ class EXACTAPI:
                     alt = alt,
                 )
             )
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
 
-    def tag_list(self) -> List[dict]:
+    def tag_list(
+            self,
+            stream: bool = False
+        ) -> Union[List[dict], Iterator[dict]]:
         """
         List all tags in the system. Authorization: USER.
 
+        :param stream: If true, return an iterator that yields the response
+            elements as they are received. Consume it before the next request.
         :returns: On success, the server responds with multi-element response.
 
         """
-        request = models.TagListRequest()
-        self._send(request)
-        return self._recv(ismultielem=True)
+        if stream:
+            return self._request_stream(models.TagListRequest())
+        return self._request(models.TagListRequest(), ismultielem=True)
 
 
     def tag_remove(self, tag_id: str) -> dict:
@@ -722,8 +1217,7 @@ class EXACTAPI:
             request = models.TagRemoveRequest(
                 tag=models.DeviceID(id=tag_id)
             )
-            self._send(request)
-            return self._recv()
+            return self._request(request)
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -735,9 +1229,7 @@ class EXACTAPI:
         :returns: On success, the server responds with RPL_ACK.
 
         """
-        request = models.TagRemoveAllRequest()
-        self._send(request)
-        return self._recv()
+        return self._request(models.TagRemoveAllRequest())
 
     # -----------------------------------------------------------------
     # Tag Communication
@@ -781,17 +1273,18 @@ class EXACTAPI:
 
         Authorization
         """
+        if isinstance(channel, str):
+            raise TypeError("channel must be a list of channel names")
         try:
             channel_count = len(channel)
-            if channel_count == 1:
-                request = models.ChannelJoinRequestVariant1(channel=channel[0])
-            elif channel_count > 1:
-                request = models.ChannelJoinRequestVariant2(channel=channel)
-            self._send(request)
-            if channel_count == 1:
-                self._recv()
-            elif channel_count > 1:
-                self._recv(ismultielem=True)
+            request = models.ChannelJoinRequest(
+                channel=channel[0] if channel_count == 1 else channel
+            )
+            return self._request(
+                request,
+                ismultielem=channel_count > 1,
+                on_response=partial(self._update_channels, channel, True)
+            )
         except ValidationError as exc:
             return self._handle_exception(exc)
 
@@ -803,23 +1296,47 @@ class EXACTAPI:
         :returns: On success, the server responds with a single-element response.
 
         """
-        request = models.ChannelListRequest()
-        self._send(request)
-        return self._recv()
+        return self._request(self._CHANNEL_LIST_REQUEST)
 
 
     def channel_leave(self, channel: List[str]) -> Union[dict, List[dict]]:
         """
         Leave a single channel (variant 1) or multiple channels (variant 2).
         """
+        if isinstance(channel, str):
+            raise TypeError("channel must be a list of channel names")
         channel_count = len(channel)
-        if channel_count == 1:
-            request = models.ChannelLeaveRequestVariant1(channel=channel[0])
-        elif channel_count > 1:
-            request = models.ChannelLeaveRequestVariant2(channel=channel)
-        self._send(request)
-        if channel_count == 1:
-            self._recv()
-        elif channel_count > 1:
-            self._recv(ismultielem=True)
+        request = models.ChannelLeaveRequest(
+            channel=channel[0] if channel_count == 1 else channel
+        )
+        return self._request(
+            request,
+            ismultielem=channel_count > 1,
+            on_response=partial(self._update_channels, channel, False)
+        )
+
+
+    def _update_channels(
+            self,
+            channel: List[str],
+            joined: bool,
+            response: Union[dict, List[dict]]
+        ):
+        """
+        Record the channels joined or left, once the server has accepted
+        the request. The channels are rejoined after a reconnect.
+
+        :param channel: Channel names.
+        :param joined: True if the channels were joined, False if left.
+        :param response: Response to the request.
+
+        """
+        if isinstance(response, list):
+            response = response[-1] if response else {}
+        if response.get("response") not in ("ack", "end"):
+            return
+        if joined:
+            self._channels.update(channel)
+        else:
+            self._channels.difference_update(channel)
 
@@ -1,10 +1,23 @@
-from typing import List, Literal, Optional, Union
-
-from pydantic import BaseModel, Field
+import os
+import sys
+from typing import Annotated, List, Literal, Optional, Tuple, Union
+
+from pydantic import (
+    AfterValidator,
+    BaseModel,
+    ConfigDict,
+    Field,
+    TypeAdapter,
+    model_validator,
+)
 
 # ---------------------------------------------------------------------
 # Definitions
 # ---------------------------------------------------------------------
+# If true, the high-rate notifications are built from the server data
+# without validation. Set EXACTAPI_TRUST_SERVER=0 to validate them.
+EXACTAPI_TRUST_SERVER = os.environ.get("EXACTAPI_TRUST_SERVER", "1") != "0"
+
 ALERT_EVENT = Literal[
     "lost",
     "compromised",
@@ -33,6 +46,23 @@ CLIENT_EVENT = Literal[
     "unsubscribed",
 ]
 
+# String drawn from a small set of values, e.g. a tag ID, interned so
+# that the notifications share one object per distinct value.
+INTERNED_STR = Annotated[str, AfterValidator(sys.intern)]
+
+# Position as (x, y, z) in the local frame, or (lat, lon, alt).
+COORDINATES = Tuple[float, float, float]
+
+# Distance measurement between a base station and a tag:
+# (<bs_id>, <distance>, <signalPower>)
+MEASUREMENT = Tuple[str, float, float]
+
+SENSOR_TYPE = Literal[
+    "humidity",
+    "pressure",
+    "temp",
+]
+
 USER_ROLE = Literal[
     "admin",
     "user",
@@ -41,11 +71,34 @@ USER_ROLE = Literal[
 # ---------------------------------------------------------------------
 # Message Primitives
 # ---------------------------------------------------------------------
-class BaseRequest(BaseModel):
+# Configuration shared by the requests and responses. Apart from
+# extra="ignore", these are the pydantic defaults, spelled out so that
+# a changed default does not slow down or alter the messages.
+class _FastBase(BaseModel):
+    model_config = ConfigDict(
+        extra="ignore",
+        validate_default=False,
+        defer_build=False,
+        populate_by_name=False,
+        str_strip_whitespace=False,
+    )
+
+class BaseRequest(_FastBase):
     request: str = Field(description="command")
     msgid: int = Field(description="message ID", default=0)
 
-class BaseResponse(BaseModel):
+def encode(request: BaseRequest) -> bytes:
+    """
+    Serialize a request into a newline-terminated message. Fields set
+    to None are left out.
+
+    :param request: Request model.
+    :returns: Message as bytes.
+
+    """
+    return request.model_dump_json(exclude_none=True).encode() + b"\n"
+
+class BaseResponse(_FastBase):
     response: str = Field(description="response type")
     msgid: int = Field(description="message ID", default=0)
 
@@ -53,22 +106,39 @@ class BaseResponse(BaseModel):
 # Response Patterns
 # ---------------------------------------------------------------------
 class ElementResponse(BaseResponse):
-    response: str = "element"
+    # The payload of an element depends on the request.
+    model_config = ConfigDict(extra="allow")
+
+    response: Literal["element"] = "element"
 
 class BeginResponse(BaseResponse):
-    response: str = "begin"
+    response: Literal["begin"] = "begin"
 
 class EndResponse(BaseResponse):
-    response: str = "end"
+    response: Literal["end"] = "end"
 
 class AckResponse(BaseResponse):
-    response: str = "ack"
+    response: Literal["ack"] = "ack"
 
 class ErrorResponse(BaseResponse):
-    response: str = "error"
+    response: Literal["error"] = "error"
     code: int = Field(description="error code")
     desc: str = Field(description="human-readable error description")
 
+# Any response message, validated by the value of the 'response' field.
+# Responses specific to a request, e.g. UserAccountResponse, are
+# elements, so they are validated separately.
+Response = Annotated[
+    Union[
+        ElementResponse,
+        BeginResponse,
+        EndResponse,
+        AckResponse,
+        ErrorResponse,
+    ],
+    Field(discriminator="response"),
+]
+
 # ---------------------------------------------------------------------
 # Common
 # ---------------------------------------------------------------------
@@ -89,271 +159,319 @@ class AuthLogoutRequest(BaseRequest):
 class AuthPingRequest(BaseRequest):
     request: str = "ping"
 
-# ---------------------------------------------------------------------
-# Requests: User Accounts
-# ---------------------------------------------------------------------
-class User(BaseModel):
-    login: str
-    password: str
-    roles: Optional[List[USER_ROLE]] = None
-    desc: Optional[str] = None
-
-class UserUpdate(BaseModel):
-    login: str
-    new_login: Optional[str] = None
-    new_password: Optional[str] = None
-    new_roles: Optional[List[USER_ROLE]] = None
-    new_desc: Optional[str] = None
-
-class UserLogin(BaseModel):
-    login: str
-
-class UserAccount(BaseModel):
-    id: int
-    login: str
-    desc: str = None
-    roles: List[USER_ROLE] = None
-
-class UserAccountResponse(ElementResponse):
-    user: UserAccount
-
-class UserCreateRequest(BaseRequest):
-    request: str = "createUser"
-    user: User
-
-class UserUpdateRequest(BaseRequest):
-    request: str = "updateUser"
-    user: UserUpdate
-
-class UserRemoveRequest(BaseRequest):
-    request: str = "removeUser"
-    user: UserLogin
-
-class UserListRequest(BaseRequest):
-    request: str = "listUsers"
-
-class UserGetRequest(BaseRequest):
-    request: str = "getUser"
-    user: UserLogin
-
-# ---------------------------------------------------------------------
-# Requests: System Configuration
-# ---------------------------------------------------------------------
-class ConfigCoordinatesRequest(BaseRequest):
-    request: str = "setCoordinates"
-    origin: List[float]
-    orientation: float
-
-class ConfigAltitudeRequest(BaseRequest):
-    request: str = "setAltitude"
-    altitude: float
-
-class ConfigGetRequest(BaseRequest):
-    request: str = "getConfig"
-    item: str
-
-class ConfigResetAllRequest(BaseRequest):
-    request: str = "resetAllConfig"
-
-# ---------------------------------------------------------------------
-# Requests: Cells
-# ---------------------------------------------------------------------
-class Cell(BaseModel):
-    id: str
-    desc: Optional[str] = None
-    ip_address: str
-    port: Optional[int] = None
-
-class CellOptionalAddr(Cell):
-    ip_address: Optional[str]
-
-class CellAddRequest(BaseRequest):
-    request: str = "addCell"
-    cell: Cell
-
-class CellUpdateRequest(BaseRequest):
-    request: str = "updateCell"
-    cell: CellOptionalAddr
-
-class CellRemoveRequest(BaseRequest):
-    request: str = "removeCell"
-    cell: DeviceID
-
-class CellRemoveAllRequest(BaseRequest):
-    request: str = "removeAllCells"
-
-class CellListRequest(BaseRequest):
-    request: str = "listCells"
-
-# ---------------------------------------------------------------------
-# Requests: Base Station
-# ---------------------------------------------------------------------
-class BaseStation(BaseModel):
-    id: str
-    desc: Optional[str] = None
-    position: List[float]
-    orientation: Optional[int] = Field(default=0, ge=0, le=359)
-    cell_id: str
-
-class BaseStationOptionalPos(BaseModel):
-    id: str
-    desc: Optional[str] = None
-    position: Optional[List[float]] = None
-    orientation: Optional[int] = Field(default=0, ge=0, le=359)
-    cell_id: str
-
-class BaseStationAddRequest(BaseRequest):
-    request: str = "addBS"
-    bs: BaseStation
-
-class BaseStationUpdateRequest(BaseRequest):
-    request: str = "updateBS"
-    bs: BaseStationOptionalPos
-
-class BaseStationListRequest(BaseRequest):
-    request: str = "listBS"
-
-class BaseStationRemoveRequest(BaseRequest):
-    request: str = "removeBS"
-    bs: DeviceID
-
-class BaseStationRemoveAllRequest(BaseRequest):
-    request: str = "removeAllBS"
-    cell: DeviceID = None
-
-# ---------------------------------------------------------------------
-# Requests: Tags
-# ---------------------------------------------------------------------
-class Tag(BaseModel):
-    id: str
-    desc: Optional[str] = None
-    mode: Optional[Union[int, str]] = None
-    alt: Optional[float] = None
-
-class TagAddRequest(BaseRequest):
-    request: str = "addTag"
-    tag: Tag
-
-class TagUpdateRequest(BaseRequest):
-    request: str = "updateTag"
-    tag: Tag
-
-class TagListRequest(BaseRequest):
-    request: str = "listTags"
-
-class TagRemoveRequest(BaseRequest):
-    request: str = "removeTag"
-    tag: DeviceID
-
-class TagRemoveAllRequest(BaseRequest):
-    request: str = "removeAllTag"
-
-# ---------------------------------------------------------------------
-# Requests: Tag Communications
-# ---------------------------------------------------------------------
-class Ntfn(BaseModel):
-    id: Optional[str] = None
-    data: str
-
-class NtfnSendRequest(BaseRequest):
-    request: str = "sendNtfn"
-    tag_id: Optional[str] = None
-    ntfn: Ntfn
-
 # ---------------------------------------------------------------------
 # Requests: Channel Subscriptions
 # ---------------------------------------------------------------------
-class ChannelJoinRequestVariant1(BaseRequest):
+# A single channel (variant 1) or a list of channels (variant 2).
+class ChannelJoinRequest(BaseRequest):
     request: str = "joinChannel"
-    channel: CHANNEL_NAME
-
-class ChannelJoinRequestVariant2(BaseRequest):
-    request: str = "joinChannel"
-    channel: List[CHANNEL_NAME]
+    channel: Union[CHANNEL_NAME, List[CHANNEL_NAME]]
 
 class ChannelListRequest(BaseRequest):
     request: str = "listChannels"
 
-class ChannelLeaveRequestVariant1(BaseRequest):
+class ChannelLeaveRequest(BaseRequest):
     request: str = "leaveChannel"
-    channel: CHANNEL_NAME
+    channel: Union[CHANNEL_NAME, List[CHANNEL_NAME]]
 
-class ChannelLeaveRequestVariant2(BaseRequest):
-    request: str = "leaveChannel"
-    channel: List[CHANNEL_NAME]
+ChannelJoinRequestVariant1 = ChannelJoinRequest
+ChannelJoinRequestVariant2 = ChannelJoinRequest
+ChannelLeaveRequestVariant1 = ChannelLeaveRequest
+ChannelLeaveRequestVariant2 = ChannelLeaveRequest
 
 # ---------------------------------------------------------------------
 # Notification Messages
 # ---------------------------------------------------------------------
-class ErrorNotification(BaseModel):
-    channel: str = "error"
+class BaseNotification(BaseModel):
+    # Notifications are read-only once received.
+    model_config = ConfigDict(frozen=True)
+
+# Fields of the high-rate notifications interned on the trusted path.
+_INTERNED_FIELDS = ("channel", "type", "tag", "validity")
+
+def _intern_fields(data: dict) -> dict:
+    """Intern the small-alphabet string fields of a notification."""
+    for field in _INTERNED_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str):
+            data[field] = sys.intern(value)
+    return data
+
+class TrustedNotification(BaseNotification):
+    @classmethod
+    def fast_from_dict(cls, data: dict):
+        """Build the model from data already validated by the server."""
+        return cls.model_construct(**cls._convert_fields(_intern_fields(data)))
+
+    @classmethod
+    def _convert_fields(cls, data: dict) -> dict:
+        """Convert the fields validation would convert.
+
+        JSON arrays of fixed length become the tuples validation returns
+        for them.
+        """
+        return data
+
+class ErrorNotification(BaseNotification):
+    channel: Literal["error"] = "error"
     code: int
     desc: str
 
-class DebugNotification(BaseModel):
-    channel: str = "debug"
+class DebugNotification(BaseNotification):
+    channel: Literal["debug"] = "debug"
     message: str
 
-class ClientNotification(BaseModel):
-    channel: str = "clients"
+class ClientNotification(BaseNotification):
+    channel: Literal["clients"] = "clients"
     conn: str
     ip_address: str
-    event: str = List[CLIENT_EVENT]
+    event: CLIENT_EVENT
     user: Union[str, None]
     reason: Union[str, None]
     target_channel: Union[str, None]
 
-class AlertNotification(BaseModel):
-    channel: str = "alerts"
+class AlertNotification(BaseNotification):
+    channel: Literal["alerts"] = "alerts"
     alert: str
     event: List[ALERT_EVENT]
     bs: str
     desc: str
 
-class MeasurementsNotification(BaseModel):
-    channel: str = "measurements"
-    type: str = "twr"
+class MeasurementsNotification(TrustedNotification):
+    channel: Literal["measurements"] = "measurements"
+    type: Literal["twr"] = "twr"
     time: str
-    tag: str
-    meas: List[list]  # [[<bs_id>,<distance>,<signalPower>, [...], ...]]
-
-class SensorTemperatureNotification(BaseModel):
-    channel: str = "sensors"
-    type: str = "temp"
-    time: str
-    tag: str
-    temp: float = Field(ge=-40, le=85)
-
-class SensorPressureNotification(BaseModel):
-    channel: str = "sensors"
-    type: str = "pressure"
-    time: str
-    tag: str
-    pressure: float
-
-class SensorHumidityNotification(BaseModel):
-    channel: str = "sensors"
-    type: str = "humidity"
+    tag: INTERNED_STR
+    meas: List[MEASUREMENT]
+
+    @classmethod
+    def _convert_fields(cls, data: dict) -> dict:
+        data["meas"] = [tuple(measurement) for measurement in data["meas"]]
+        return data
+
+# Bounds of the sensor values, by the type of the sensor notification.
+_SENSOR_BOUNDS = {
+    "temp": (-40, 85),
+    "humidity": (0, 100),
+}
+
+# The temperature, pressure and humidity notifications differ only in
+# the key of the value, which is named after the type.
+class SensorNotification(TrustedNotification):
+    channel: Literal["sensors"] = "sensors"
+    type: SENSOR_TYPE
     time: str
-    tag: str
-    humidity: int = Field(ge=0, le=100)
+    tag: INTERNED_STR
+    value: float
+
+    @model_validator(mode="before")
+    @classmethod
+    def _value_from_type(cls, data):
+        if not isinstance(data, dict) or "value" in data:
+            return data
+        # The former sensor notification classes default the type.
+        sensor_type = data.get("type", cls.model_fields["type"].default)
+        if not isinstance(sensor_type, str) or sensor_type not in data:
+            return data
+        return {**data, "value": data[sensor_type]}
+
+    @model_validator(mode="after")
+    def _check_bounds(self):
+        bounds = _SENSOR_BOUNDS.get(self.type)
+        if bounds is not None and not bounds[0] <= self.value <= bounds[1]:
+            raise ValueError(
+                f"{self.type} must be between {bounds[0]} and {bounds[1]}"
+            )
+        return self
+
+    @classmethod
+    def _convert_fields(cls, data: dict) -> dict:
+        if "value" not in data:
+            data["value"] = data.get(data.get("type"))
+        return data
+
+# The former sensor notification classes, for building a notification
+# of one type, e.g. SensorTemperatureNotification(time=..., tag=...,
+# temp=20). The value is in the 'value' field of these too.
+class SensorTemperatureNotification(SensorNotification):
+    type: Literal["temp"] = "temp"
+
+class SensorPressureNotification(SensorNotification):
+    type: Literal["pressure"] = "pressure"
+
+class SensorHumidityNotification(SensorNotification):
+    type: Literal["humidity"] = "humidity"
 
 class Velocity(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     speed: float
     vertical: float
-    heading_lcl: float
-    heading_trf: Union[float, None]
+    # The EXL server sends the headings as one-element lists, e.g.
+    # "heading_lcl": [333.62] in the solution notifications of
+    # exafore.log, and omits them from some frames.
+    heading_lcl: Optional[List[float]] = None
+    heading_trf: Optional[List[float]] = None
 
 class Accuracy(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     horizontal: float
     vertical: float
 
-class SolutionNotification(BaseModel):
-    channel: str = "solution"
+class SolutionNotification(TrustedNotification):
+    channel: Literal["solution"] = "solution"
     time: str
-    tag: str
-    validity: str
-    position_lcl: List[float]
-    position_trf: List[float]
+    tag: INTERNED_STR
+    validity: INTERNED_STR
+    position_lcl: COORDINATES
+    position_trf: Optional[COORDINATES] = None
     velocity: Velocity
     accuracy: Accuracy
+
+    @classmethod
+    def _convert_fields(cls, data: dict) -> dict:
+        position_trf = data.get("position_trf")
+        return {
+            **data,
+            "position_lcl": tuple(data["position_lcl"]),
+            "position_trf": position_trf and tuple(position_trf),
+            "velocity": Velocity.model_construct(**data["velocity"]),
+            "accuracy": Accuracy.model_construct(**data["accuracy"]),
+        }
+
+# Any notification message, validated by the value of the 'channel'
+# field.
+Notification = Annotated[
+    Union[
+        ErrorNotification,
+        DebugNotification,
+        ClientNotification,
+        AlertNotification,
+        MeasurementsNotification,
+        SensorNotification,
+        SolutionNotification,
+    ],
+    Field(discriminator="channel"),
+]
+
+# Built at import, so that the first notification does not pay for it.
+NOTIFICATION_ADAPTER = TypeAdapter(Notification)
+
+# Channels whose notifications have a model. The notifications of the
+# other channels, i.e. 'systemtime' and 'tags', are not validated.
+NOTIFICATION_CHANNELS = frozenset((
+    "alerts",
+    "clients",
+    "debug",
+    "error",
+    "measurements",
+    "sensors",
+    "solution",
+))
+
+_TRUSTED_NOTIFICATIONS = {
+    "measurements": MeasurementsNotification,
+    "sensors": SensorNotification,
+    "solution": SolutionNotification,
+}
+
+
+def construct_notification(data: dict) -> Optional[TrustedNotification]:
+    """
+    Build a high-rate notification model without validation.
+
+    :param data: Notification message as a dictionary.
+    :returns: Notification model, or None if the message is not one of
+        the high-rate notifications.
+
+    """
+    model = _TRUSTED_NOTIFICATIONS.get(data.get("channel"))
+    if model is None:
+        return None
+    return model.fast_from_dict(data)
+
+
+# TypeAdapters of the messages received from the server, built at import
+# so that the first message of each type does not pay for it.
+_ADAPTERS = {
+    model: TypeAdapter(model) for model in (
+        Response,
+        ElementResponse,
+        BeginResponse,
+        EndResponse,
+        AckResponse,
+        ErrorResponse,
+        ErrorNotification,
+        DebugNotification,
+        ClientNotification,
+        AlertNotification,
+        MeasurementsNotification,
+        SensorNotification,
+        SolutionNotification,
+    )
+}
+_ADAPTERS[Notification] = NOTIFICATION_ADAPTER
+
+
+def adapter_for(model) -> TypeAdapter:
+    """
+    Get the TypeAdapter of a model or a union of models.
+
+    :param model: Model class, or e.g. Response or Notification.
+    :returns: Cached TypeAdapter, built on first use if not prebuilt.
+
+    """
+    adapter = _ADAPTERS.get(model)
+    if adapter is None:
+        adapter = _ADAPTERS[model] = TypeAdapter(model)
+    return adapter
+
+
+# Models of the administration requests in exactapi._admin, imported
+# on first access as attributes of this module.
+_ADMIN_MODELS = frozenset((
+    "User",
+    "UserUpdate",
+    "UserLogin",
+    "UserAccount",
+    "UserAccountResponse",
+    "UserCreateRequest",
+    "UserUpdateRequest",
+    "UserRemoveRequest",
+    "UserListRequest",
+    "UserGetRequest",
+    "ConfigCoordinatesRequest",
+    "ConfigAltitudeRequest",
+    "ConfigGetRequest",
+    "ConfigResetAllRequest",
+    "Cell",
+    "CellOptionalAddr",
+    "CellAddRequest",
+    "CellUpdateRequest",
+    "CellRemoveRequest",
+    "CellRemoveAllRequest",
+    "CellListRequest",
+    "BaseStation",
+    "BaseStationOptionalPos",
+    "BaseStationAddRequest",
+    "BaseStationUpdateRequest",
+    "BaseStationListRequest",
+    "BaseStationRemoveRequest",
+    "BaseStationRemoveAllRequest",
+    "Tag",
+    "TagAddRequest",
+    "TagUpdateRequest",
+    "TagListRequest",
+    "TagRemoveRequest",
+    "TagRemoveAllRequest",
+    "Ntfn",
+    "NtfnSendRequest",
+))
+
+
+def __getattr__(name: str):
+    if name in _ADMIN_MODELS:
+        from exactapi import _admin
+        return getattr(_admin, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,91 @@
+from typing import List, Optional, Tuple, Union
+
+import msgspec
+
+# ---------------------------------------------------------------------
+# High-rate Notification Messages
+# ---------------------------------------------------------------------
+# msgspec counterparts of the measurements, sensors and solution
+# notifications in exactapi.models. The 'channel' field is the tag of
+# the union, so it is not an attribute of the structs.
+class MeasurementsNotification(
+        msgspec.Struct,
+        frozen=True,
+        tag_field="channel",
+        tag="measurements"
+    ):
+    type: str
+    time: str
+    tag: str
+    # [(<bs_id>, <distance>, <signalPower>), ...]
+    meas: List[Tuple[str, float, float]]
+
+# A union can be tagged by one field only, so the temperature, pressure
+# and humidity notifications share one struct, told apart by 'type'.
+class SensorNotification(
+        msgspec.Struct,
+        frozen=True,
+        tag_field="channel",
+        tag="sensors"
+    ):
+    type: str
+    time: str
+    tag: str
+    temp: Optional[float] = None
+    pressure: Optional[float] = None
+    humidity: Optional[float] = None
+
+class Velocity(msgspec.Struct, frozen=True):
+    speed: float
+    vertical: float
+    # One-element lists, as in models.Velocity.
+    heading_lcl: Optional[List[float]] = None
+    heading_trf: Optional[List[float]] = None
+
+class Accuracy(msgspec.Struct, frozen=True):
+    horizontal: float
+    vertical: float
+
+class SolutionNotification(
+        msgspec.Struct,
+        frozen=True,
+        tag_field="channel",
+        tag="solution"
+    ):
+    time: str
+    tag: str
+    validity: str
+    position_lcl: Tuple[float, float, float]
+    velocity: Velocity
+    accuracy: Accuracy
+    position_trf: Optional[Tuple[float, float, float]] = None
+
+Notification = Union[
+    MeasurementsNotification,
+    SensorNotification,
+    SolutionNotification,
+]
+
+_DECODER = msgspec.json.Decoder(Notification)
+
+# Channels of the notifications in the Notification union.
+_STRUCT_CHANNELS = frozenset(("measurements", "sensors", "solution"))
+
+
+def decode_notification(message: bytes) -> Union[Notification, dict]:
+    """
+    Decode a notification message.
+
+    :param message: Newline-terminated message.
+    :returns: Notification struct for the measurements, sensors and
+        solution channels, or an exception response if such a
+        notification is invalid. Otherwise the message as a dictionary.
+
+    """
+    try:
+        return _DECODER.decode(message)
+    except msgspec.ValidationError as exc:
+        data = msgspec.json.decode(message)
+        if data.get("channel") in _STRUCT_CHANNELS:
+            return {"response": "exception", "errors": [{"msg": str(exc)}]}
+        return data